@@ -1,8 +1,21 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
-class RecipesConfig(AppConfig):
+class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
     verbose_name = "API"
     label = "api"
+
+    def ready(self):
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        from . import signals  # noqa: F401
+
+        pdfmetrics.registerFont(
+            TTFont('Arial', os.path.join(settings.BASE_DIR, 'arial.ttf'))
+        )
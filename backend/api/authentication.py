@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .versions import VERSION_KEY, get_version
+
+TOKEN_KEY = 'auth-token:{}'
+# Счётчики обновляются через UPDATE в обход save(). Без них в снимке
+# save() пользователя сохранит только загруженные поля и не затрёт их.
+DEFERRED_USER_FIELDS = ('user__recipes_count', 'user__followers_count')
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, запоминающая пользователя токена в кеше.
+
+    Снимок пользователя хранится вместе с версией token:<key>, прочитанной
+    до запроса в базу. Сохранение пользователя и удаление токена (выход
+    через djoser) меняют версию, поэтому устаревший снимок не используется,
+    даже если его успел записать параллельный запрос.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = TOKEN_KEY.format(key)
+        version_key = VERSION_KEY.format(f'token:{key}')
+        cached = cache.get_many((cache_key, version_key))
+        if cache_key in cached and version_key in cached:
+            user, version = cached[cache_key]
+            if version == cached[version_key]:
+                return user, Token(key=key, user=user)
+        version = cached.get(version_key) or get_version(f'token:{key}')
+        try:
+            token = self.get_model().objects.select_related('user').defer(
+                *DEFERRED_USER_FIELDS
+            ).get(key=key)
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        user = token.user
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        cache.set(
+            cache_key, (user, version), settings.AUTH_TOKEN_CACHE_TIMEOUT
+        )
+        return user, token
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    def to_internal_value(self, base64_data):
+        if isinstance(base64_data, str):
+            # Размер проверяется до декодирования: 4 символа base64
+            # кодируют 3 байта.
+            size = len(base64_data.partition(';base64,')[2] or base64_data)
+            if size * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{filesizeformat(settings.RECIPE_IMAGE_MAX_SIZE)}'
+                )
+        return super().to_internal_value(base64_data)
@@ -1,8 +1,12 @@
+from django import forms
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
 from recipes.models import Recipe
+from recipes.search import search_recipes
+from .indexes import get_tag_ids
 
 User = get_user_model()
 
@@ -11,13 +15,38 @@ class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
 
 
+class MultipleSlugField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        return [slug for slug in value if slug]
+
+
+class MultipleSlugFilter(filters.Filter):
+    field_class = MultipleSlugField
+
+
 class AuthorAndTagFilter(FilterSet):
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = MultipleSlugFilter(method='filter_tags')
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        # Подзапрос вместо JOIN по тегам: рецепт с несколькими
+        # подходящими тегами не дублируется и DISTINCT не нужен.
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=get_tag_ids(value)
+            )
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -29,6 +58,9 @@ class AuthorAndTagFilter(FilterSet):
             return queryset.filter(cart__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
@@ -0,0 +1,65 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from recipes.models import Recipe
+from .versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def encode_webp(image):
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=settings.IMAGE_WEBP_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(recipe_id, image_name):
+    saved = []
+    try:
+        with default_storage.open(image_name) as file:
+            image = Image.open(file)
+            image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        webp_name = default_storage.save(
+            f'recipes/webp/{stem}.webp', encode_webp(image)
+        )
+        saved.append(webp_name)
+        image.thumbnail(settings.IMAGE_THUMBNAIL_SIZE)
+        thumbnail_name = default_storage.save(
+            f'recipes/thumbnails/{stem}.webp', encode_webp(image)
+        )
+        saved.append(thumbnail_name)
+        # Если картинку успели заменить, варианты старой уже не нужны.
+        if Recipe.objects.filter(id=recipe_id, image=image_name).update(
+            image_thumbnail=thumbnail_name, image_webp=webp_name
+        ):
+            saved = []
+            bump_version(f'recipe:{recipe_id}')
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', image_name)
+    finally:
+        for name in saved:
+            default_storage.delete(name)
+        connection.close()
+
+
+def schedule_variants(recipe):
+    recipe_id, image_name = recipe.id, recipe.image.name
+    transaction.on_commit(
+        lambda: executor.submit(generate_variants, recipe_id, image_name)
+    )
@@ -0,0 +1,189 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.db_router import use_primary
+from recipes.models import Ingredient, IngredientAmount, Tag
+from .versions import bump_version, get_version
+
+
+class IngredientPrefixIndex:
+    """Индекс префиксов названий ингредиентов в памяти процесса.
+
+    Строится лениво и перестраивается, когда меняется версия каталога
+    ингредиентов. Результаты возвращаются в том же порядке, в каком их
+    отдаёт база (сортировка по названию).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = None
+
+    def _get_snapshot(self):
+        version = get_version('ingredients')
+        if version == self._version:
+            return self._snapshot
+        with self._lock:
+            if version == self._version:
+                return self._snapshot
+            with use_primary():
+                items = list(Ingredient.objects.values(
+                    'id', 'name', 'measurement_unit'
+                ))
+            entries = sorted(
+                (item['name'].casefold(), position)
+                for position, item in enumerate(items)
+            )
+            self._snapshot = (
+                items,
+                [key for key, _ in entries],
+                [position for _, position in entries],
+            )
+            self._version = version
+            return self._snapshot
+
+    def search(self, terms):
+        items, keys, positions = self._get_snapshot()
+        found = None
+        for term in terms:
+            prefix = term.casefold()
+            start = bisect_left(keys, prefix)
+            end = bisect_right(keys, prefix + '\U0010ffff', lo=start)
+            matched = set(positions[start:end])
+            found = matched if found is None else found & matched
+        return [items[position] for position in sorted(found)]
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+RECIPE_INGREDIENTS_VERSION = 'recipe-ingredients'
+RECIPE_INGREDIENTS_CHANGES_KEY = 'recipe-ingredients-changes:{}'
+RECIPE_INGREDIENTS_CHANGES_TIMEOUT = 60 * 60 * 24
+# Если процесс отстал сильнее, дешевле перестроить индекс целиком.
+MAX_REPLAYED_CHANGES = 100
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс «ингредиент -> рецепты» в памяти процесса.
+
+    Строится лениво при первом обращении. Изменения состава рецептов
+    публикуются в кеше как версия и список затронутых рецептов, так что
+    каждый процесс перечитывает из базы только изменившиеся рецепты.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._recipes = {}
+        self._postings = defaultdict(set)
+
+    def _load(self, recipe_ids=None):
+        queryset = IngredientAmount.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        )
+        if recipe_ids is not None:
+            queryset = queryset.filter(recipe_id__in=recipe_ids)
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in queryset.iterator():
+            recipes[recipe_id].add(ingredient_id)
+        return recipes
+
+    def _replace(self, recipe_id, ingredient_ids):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            postings = self._postings[ingredient_id]
+            postings.discard(recipe_id)
+            if not postings:
+                del self._postings[ingredient_id]
+        if ingredient_ids:
+            self._recipes[recipe_id] = frozenset(ingredient_ids)
+            for ingredient_id in ingredient_ids:
+                self._postings[ingredient_id].add(recipe_id)
+
+    def _get_changes(self, version):
+        if self._version is None:
+            return None
+        if not 0 < version - self._version <= MAX_REPLAYED_CHANGES:
+            return None
+        keys = [
+            RECIPE_INGREDIENTS_CHANGES_KEY.format(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        return set().union(*changes.values())
+
+    def _sync(self):
+        version = get_version(RECIPE_INGREDIENTS_VERSION)
+        if version == self._version:
+            return
+        changed = self._get_changes(version)
+        with use_primary():
+            if changed is None:
+                self._recipes = {}
+                self._postings = defaultdict(set)
+                loaded = self._load()
+                changed = loaded
+            else:
+                loaded = self._load(changed)
+        for recipe_id in changed:
+            self._replace(recipe_id, loaded.get(recipe_id))
+        self._version = version
+
+    def match(self, ingredient_ids):
+        """Рецепты, в которых есть хотя бы один из ингредиентов.
+
+        Возвращает тройки (id рецепта, сколько ингредиентов есть, сколько
+        всего), от лучшего покрытия к худшему; при равном покрытии выше
+        рецепты с меньшим числом недостающих ингредиентов.
+        """
+        with self._lock:
+            self._sync()
+            counts = Counter()
+            for ingredient_id in set(ingredient_ids):
+                counts.update(self._postings.get(ingredient_id, ()))
+            matches = [
+                (recipe_id, matched, len(self._recipes[recipe_id]))
+                for recipe_id, matched in counts.items()
+            ]
+        matches.sort(key=lambda item: (
+            -item[1] / item[2], item[2] - item[1], -item[0]
+        ))
+        return matches
+
+
+def recipe_ingredients_index_changed(recipe_ids):
+    recipe_ids = set(recipe_ids)
+
+    def publish():
+        version = bump_version(RECIPE_INGREDIENTS_VERSION)
+        cache.set(
+            RECIPE_INGREDIENTS_CHANGES_KEY.format(version),
+            recipe_ids,
+            RECIPE_INGREDIENTS_CHANGES_TIMEOUT,
+        )
+
+    # Другие процессы должны перечитать рецепты уже после коммита.
+    transaction.on_commit(publish)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
+
+
+TAG_SLUGS_KEY = 'tag-slugs:{}'
+
+
+def get_tag_ids(slugs):
+    """id тегов по слагам; неизвестные слаги пропускаются."""
+    key = TAG_SLUGS_KEY.format(get_version('tags'))
+    slug_map = cache.get(key)
+    if slug_map is None:
+        with use_primary():
+            slug_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, slug_map, None)
+    return [slug_map[slug] for slug in slugs if slug in slug_map]
@@ -0,0 +1,309 @@
+import json
+import math
+import random
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (CaptureQueriesContext, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIClient
+
+from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
+                            Recipe, Tag)
+from recipes.search import update_search_index
+from users.models import Follow, User
+from ...pagination import RecipeCursorPagination
+
+QUERY_BUDGETS = {
+    'recipes': 4,
+    'recipes_anonymous': 4,
+    'recipes_cards': 2,
+    'recipes_deep_page': 4,
+    'recipes_cursor': 3,
+    'recipes_tags': 4,
+    'recipes_author': 5,
+    'recipes_search': 4,
+    'recipes_match': 3,
+    'recipes_batch': 3,
+    'recipes_is_favorited': 4,
+    'recipes_is_in_shopping_cart': 4,
+    'subscriptions': 3,
+    'users': 2,
+    'ingredients_search': 0,
+    'download_shopping_cart': 1,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Засевает тестовую базу и замеряет число SQL-запросов и время '
+        'ответа основных эндпоинтов API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--recipes', type=int, default=3000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument(
+            '--report',
+            default='benchmark_report.json',
+            help='Путь к JSON-отчёту',
+        )
+        parser.add_argument(
+            '--budget',
+            action='append',
+            default=[],
+            metavar='NAME=QUERIES',
+            help='Переопределить бюджет запросов для сценария',
+        )
+
+    def handle(self, *args, **options):
+        budgets = dict(QUERY_BUDGETS)
+        for item in options['budget']:
+            name, _, value = item.partition('=')
+            if name not in budgets or not value.isdigit():
+                raise CommandError(f'Некорректный бюджет: {item}')
+            budgets[name] = int(value)
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = self.seed(options)
+            results = self.run_scenarios(user, options, budgets)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        with open(options['report'], 'w', encoding='utf-8') as report:
+            json.dump(results, report, ensure_ascii=False, indent=2)
+
+        failed = [result for result in results if not result['passed']]
+        for result in results:
+            self.stdout.write(
+                f'{result["name"]:<30} {result["status"]:>4} '
+                f'queries={result["queries"]:<4} '
+                f'budget={result["budget"]:<4} '
+                f'median={result["median_ms"]:.1f}ms '
+                f'p95={result["p95_ms"]:.1f}ms'
+            )
+        if failed:
+            raise CommandError(
+                'Превышен бюджет запросов: '
+                + ', '.join(result['name'] for result in failed)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["report"]}'
+        ))
+
+    def seed(self, options):
+        rng = random.Random(0)
+        User.objects.bulk_create(
+            User(
+                email=f'user{i}@foodgram.ru',
+                username=f'user{i}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='!',
+            )
+            for i in range(options['users'])
+        )
+        users = list(User.objects.order_by('id'))
+        Tag.objects.bulk_create(
+            Tag(name=slug, color='#E26C2D', slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        )
+        tags = list(Tag.objects.all())
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент-{i:05d}', measurement_unit='г')
+            for i in range(options['ingredients'])
+        )
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=rng.choice(users),
+                name=f'Рецепт {i}',
+                image='recipes/benchmark.png',
+                text='Описание рецепта ' * 20,
+                cooking_time=rng.randint(5, 120),
+            )
+            for i in range(options['recipes'])
+        )
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        update_search_index(recipe_ids)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+            for recipe_id in recipe_ids
+            for tag in rng.sample(tags, rng.randint(1, len(tags)))
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(ingredient_ids, 8)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=follower, author=author)
+            for follower in users
+            for author in rng.sample(users, 20)
+            if author != follower
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe_id=recipe_id)
+            for user in users
+            for recipe_id in rng.sample(recipe_ids, 30)
+        )
+        Cart.objects.bulk_create(
+            Cart(user=user, recipe_id=recipe_id)
+            for user in users
+            for recipe_id in rng.sample(recipe_ids, 10)
+        )
+        return users[0]
+
+    def get_scenarios(self, user, page_size):
+        slugs = Tag.objects.values_list('slug', flat=True)
+        tags = '&'.join(f'tags={slug}' for slug in slugs)
+        author = Recipe.objects.values_list('author_id', flat=True).first()
+        ingredient_ids = Ingredient.objects.order_by('id').values_list(
+            'id', flat=True
+        )[:200]
+        ingredients = ','.join(map(str, ingredient_ids))
+        batch_ids = Recipe.objects.order_by('cooking_time', 'id').values_list(
+            'id', flat=True
+        )[:page_size]
+        batch = ','.join(map(str, batch_ids))
+        deep_page = max(Recipe.objects.count() // page_size // 2, 1)
+        return (
+            ('recipes', user, f'/api/recipes/?limit={page_size}'),
+            ('recipes_anonymous', None, f'/api/recipes/?limit={page_size}'),
+            (
+                'recipes_cards',
+                user,
+                f'/api/recipes/?limit={page_size}'
+                '&fields=id,name,image,cooking_time,is_favorited',
+            ),
+            (
+                'recipes_deep_page',
+                user,
+                f'/api/recipes/?limit={page_size}&page={deep_page}',
+            ),
+            (
+                'recipes_cursor',
+                user,
+                self.get_cursor_url(
+                    f'/api/recipes/?limit={page_size}',
+                    (deep_page - 1) * page_size,
+                ),
+            ),
+            ('recipes_tags', user, f'/api/recipes/?limit={page_size}&{tags}'),
+            (
+                'recipes_author',
+                user,
+                f'/api/recipes/?limit={page_size}&author={author}',
+            ),
+            (
+                'recipes_search',
+                user,
+                f'/api/recipes/?limit={page_size}&search=рецепт+описание',
+            ),
+            (
+                'recipes_match',
+                user,
+                f'/api/recipes/match/?limit={page_size}'
+                f'&ingredients={ingredients}',
+            ),
+            ('recipes_batch', user, f'/api/recipes/?ids={batch}'),
+            (
+                'recipes_is_favorited',
+                user,
+                f'/api/recipes/?limit={page_size}&is_favorited=1',
+            ),
+            (
+                'recipes_is_in_shopping_cart',
+                user,
+                f'/api/recipes/?limit={page_size}&is_in_shopping_cart=1',
+            ),
+            (
+                'subscriptions',
+                user,
+                f'/api/users/subscriptions/?limit={page_size}'
+                '&recipes_limit=3',
+            ),
+            ('users', user, f'/api/users/?limit={page_size}'),
+            (
+                'ingredients_search',
+                None,
+                '/api/ingredients/?name=ингредиент-001',
+            ),
+            (
+                'download_shopping_cart',
+                user,
+                '/api/recipes/download_shopping_cart/',
+            ),
+        )
+
+    def get_cursor_url(self, url, offset):
+        # Курсор, указывающий на ту же глубину, что и recipes_deep_page.
+        pagination = RecipeCursorPagination()
+        pagination.base_url = url
+        pub_date = Recipe.objects.order_by(
+            *pagination.ordering
+        ).values_list('pub_date', flat=True)[offset]
+        return pagination.encode_cursor(Cursor(
+            offset=0, reverse=False, position=str(pub_date)
+        ))
+
+    def run_scenarios(self, user, options, budgets):
+        clients = {None: APIClient()}
+        token = Token.objects.create(user=user)
+        clients[user] = APIClient()
+        clients[user].credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        results = []
+        for name, client_user, url in self.get_scenarios(
+            user, options['page_size']
+        ):
+            client = clients[client_user]
+            timings = []
+            queries = []
+            status_code = None
+            for _ in range(options['repeat']):
+                # Запросы считаются по всем подключениям, включая реплики.
+                with ExitStack() as stack:
+                    contexts = [
+                        stack.enter_context(CaptureQueriesContext(db))
+                        for db in connections.all()
+                    ]
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(sum(
+                    len(context.captured_queries) for context in contexts
+                ))
+                status_code = response.status_code
+            timings.sort()
+            results.append({
+                'name': name,
+                'url': url,
+                'status': status_code,
+                # Бюджет проверяется по прогретому запросу: первый может
+                # заполнять кеши и индексы.
+                'cold_queries': queries[0],
+                'queries': queries[-1],
+                'budget': budgets[name],
+                'passed': status_code == 200 and queries[-1] <= budgets[name],
+                'min_ms': timings[0],
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[math.ceil(len(timings) * 0.95) - 1],
+            })
+        return results
@@ -0,0 +1,275 @@
+import glob
+import http.client
+import itertools
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe, Tag
+from .benchmark_api import Command as BenchmarkApiCommand
+
+# Варианты запуска gunicorn с одинаковым числом одновременно обрабатываемых
+# запросов --threads: синхронные воркеры по процессу на запрос, один воркер
+# gthread с потоками и один воркер uvicorn с пулом ASYNC_DB_WORKERS потоков.
+SERVERS = {
+    'sync': (
+        'foodgram.wsgi:application',
+        ('--worker-class', 'sync', '--workers', '{threads}'),
+    ),
+    'gthread': (
+        'foodgram.wsgi:application',
+        ('--worker-class', 'gthread', '--workers', '1',
+         '--threads', '{threads}'),
+    ),
+    'asgi': (
+        'foodgram.asgi:application',
+        ('--worker-class', 'uvicorn.workers.UvicornWorker',
+         '--workers', '1'),
+    ),
+}
+SERVER_START_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает gunicorn с синхронными воркерами, gthread и uvicorn на '
+        'засеянной тестовой базе и сравнивает пропускную способность и '
+        'память рабочих процессов на основных эндпоинтах для чтения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Число одновременных клиентов',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help=(
+                'Одновременных запросов на сервер: синхронные воркеры, '
+                'потоки gthread и ASYNC_DB_WORKERS'
+            ),
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=5.0,
+            help='Задержка каждого SQL-запроса в мс: сеть до базы',
+        )
+        parser.add_argument(
+            '--servers',
+            nargs='+',
+            choices=SERVERS,
+            default=list(SERVERS),
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            self.use_database_files(directory)
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                user = BenchmarkApiCommand().seed(options)
+                token = Token.objects.create(user=user)
+                urls = self.get_urls(options['page_size'])
+                env = self.get_server_env(options)
+                results = {
+                    name: self.run_server(name, urls, token, env, options)
+                    for name in options['servers']
+                }
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        self.stdout.write(
+            f'{options["requests"]} запросов, '
+            f'{options["concurrency"]} клиентов, '
+            f'{options["threads"]} потоков, '
+            f'задержка базы {options["latency"]}мс'
+        )
+        for name, result in results.items():
+            rss = result['rss_mb']
+            self.stdout.write(
+                f'{name:<8} rps={result["rps"]:.1f} '
+                f'median={result["median_ms"]:.1f}ms '
+                f'p95={result["p95_ms"]:.1f}ms '
+                f'rss={"-" if rss is None else f"{rss:.0f}MB"} '
+                f'errors={result["errors"]}'
+            )
+        if any(result['errors'] for result in results.values()):
+            raise CommandError('Часть запросов завершилась с ошибкой')
+
+    def use_database_files(self, directory):
+        # Тестовая база SQLite по умолчанию в памяти, а серверы - отдельные
+        # процессы: им нужна база в файле.
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            if (
+                settings_dict['ENGINE'].endswith('sqlite3')
+                and not settings_dict['TEST']['NAME']
+            ):
+                settings_dict['TEST']['NAME'] = os.path.join(
+                    directory, f'{alias}.sqlite3'
+                )
+
+    def get_server_env(self, options):
+        env = {
+            **os.environ,
+            'DB_NAME': connections['default'].settings_dict['NAME'],
+            'ASYNC_DB_WORKERS': str(options['threads']),
+            'BENCHMARK_DB_LATENCY': str(options['latency']),
+        }
+        # foodgram.asgi сам выбирает маршруты с асинхронными представлениями.
+        env.pop('ROOT_URLCONF', None)
+        return env
+
+    def get_urls(self, page_size):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        tag = Tag.objects.values_list('slug', flat=True).first()
+        rng = random.Random(0)
+        urls = (
+            f'/api/recipes/?limit={page_size}',
+            f'/api/recipes/{rng.choice(recipe_ids)}/',
+            f'/api/recipes/?limit={page_size}&tags={tag}',
+            '/api/ingredients/?name=ингредиент-001',
+            '/api/tags/',
+            f'/api/users/subscriptions/?limit={page_size}&recipes_limit=3',
+            f'/api/recipes/{rng.choice(recipe_ids)}/',
+        )
+        return [quote(url, safe='/?&=') for url in urls]
+
+    def get_free_port(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def run_server(self, name, urls, token, env, options):
+        app, server_args = SERVERS[name]
+        port = self.get_free_port()
+        command = [
+            sys.executable, '-m', 'gunicorn', app,
+            *(arg.format(threads=options['threads']) for arg in server_args),
+            '--bind', f'127.0.0.1:{port}',
+            '--config', 'python:foodgram.gunicorn_benchmark',
+            '--log-level', 'warning',
+        ]
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        try:
+            self.wait_for_server(name, server, port)
+            # Прогрев: подключения к базе и кеши воркеров.
+            self.run_load(
+                port, urls, token,
+                options['concurrency'] * 2, options['concurrency'],
+            )
+            result = self.run_load(
+                port, urls, token,
+                options['requests'], options['concurrency'],
+            )
+            result['rss_mb'] = self.get_workers_rss(server.pid)
+        finally:
+            server.terminate()
+            server.wait(SERVER_START_TIMEOUT)
+        return result
+
+    def wait_for_server(self, name, server, port):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Сервер {name} не запустился')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'Сервер {name} не ответил за '
+                           f'{SERVER_START_TIMEOUT} секунд')
+
+    def run_load(self, port, urls, token, requests, concurrency):
+        urls = itertools.cycle(urls)
+        lock = threading.Lock()
+        remaining = iter(range(requests))
+        timings, errors = [], []
+        headers = {'Authorization': f'Token {token.key}'}
+
+        def client_loop():
+            # Следующий запрос клиент отправляет только после ответа.
+            connection = http.client.HTTPConnection(
+                '127.0.0.1', port, timeout=60
+            )
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                    url = next(urls)
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', url, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    status = None
+                timings.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors.append(url)
+            connection.close()
+
+        threads = [
+            threading.Thread(target=client_loop) for _ in range(concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summarize(timings, errors, time.perf_counter() - start)
+
+    def get_workers_rss(self, pid):
+        """Суммарная пиковая память (VmHWM) рабочих процессов в МБ."""
+        if not os.path.isdir('/proc'):
+            return None
+        total = 0
+        for path in glob.glob('/proc/[0-9]*/status'):
+            try:
+                with open(path) as status:
+                    fields = dict(
+                        line.split(':', 1) for line in status if ':' in line
+                    )
+            except OSError:
+                continue
+            if int(fields.get('PPid', 0)) == pid:
+                total += int(fields.get('VmHWM', '0 kB').split()[0])
+        return total / 1024
+
+    def summarize(self, timings, errors, elapsed):
+        timings.sort()
+        return {
+            'rps': len(timings) / elapsed,
+            'median_ms': statistics.median(timings),
+            'p95_ms': timings[max(math.ceil(len(timings) * 0.95) - 1, 0)],
+            'errors': len(errors),
+        }
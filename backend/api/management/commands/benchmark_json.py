@@ -0,0 +1,124 @@
+import io
+import statistics
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from ...renderers import FastJSONParser, FastJSONRenderer, orjson
+from .benchmark_api import Command as BenchmarkApiCommand
+
+# Типы, которые orjson сам не кодирует или кодирует иначе, чем DRF.
+EDGE_CASES = {
+    'datetime': datetime(2022, 1, 19, 16, 53, 1, 123456, tzinfo=timezone.utc),
+    'date': date(2022, 1, 19),
+    'decimal': Decimal('12.50'),
+    'lazy': gettext_lazy('Рецепт'),
+    'separators': 'строка\u2028абзац\u2029',
+    'nested': [{'id': 1, 'amount': Decimal('0.1')}],
+    'floats': [0.0, 0.5, 1e-4, 1e15, 1e16, -2.5e22, 1.5e-7],
+    1: 'нестроковый ключ',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартный JSON-рендерер DRF и рендерер на orjson '
+        'на странице списка рецептов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен, FastJSONRenderer работает через '
+                'стандартный json'
+            ))
+        self.check_compatibility(EDGE_CASES)
+        self.check_non_finite()
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = BenchmarkApiCommand().seed(options)
+            client = APIClient()
+            token = Token.objects.create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            data = client.get(
+                f'/api/recipes/?limit={options["page_size"]}'
+            ).data
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        payload = self.check_compatibility(data)
+        self.stdout.write(
+            f'Страница из {len(data["results"])} рецептов, '
+            f'{len(payload) / 1024:.1f} КБ'
+        )
+        repeat = options['repeat']
+        results = (
+            ('render json', self.measure(
+                lambda: JSONRenderer().render(data), repeat
+            )),
+            ('render orjson', self.measure(
+                lambda: FastJSONRenderer().render(data), repeat
+            )),
+            ('parse json', self.measure(
+                lambda: JSONParser().parse(io.BytesIO(payload)), repeat
+            )),
+            ('parse orjson', self.measure(
+                lambda: FastJSONParser().parse(io.BytesIO(payload)), repeat
+            )),
+        )
+        for name, timings in results:
+            self.stdout.write(
+                f'{name:<15} median={statistics.median(timings):.3f}ms '
+                f'min={timings[0]:.3f}ms'
+            )
+        speedup = (
+            statistics.median(results[0][1])
+            / statistics.median(results[1][1])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'orjson рендерит в {speedup:.1f} раза быстрее'
+        ))
+
+    def check_compatibility(self, data):
+        expected = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != expected:
+            raise CommandError('Вывод FastJSONRenderer отличается от DRF')
+        return expected
+
+    def check_non_finite(self):
+        # Строгий JSONRenderer не пропускает NaN и бесконечность.
+        for value in (float('nan'), float('inf'), float('-inf')):
+            try:
+                FastJSONRenderer().render({'value': value})
+            except ValueError:
+                continue
+            raise CommandError(
+                f'FastJSONRenderer не отклонил {value}, в отличие от DRF'
+            )
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
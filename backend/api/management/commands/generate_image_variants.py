@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-версии для изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать варианты и для уже обработанных рецептов',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.exclude(image='')
+        if not options['all']:
+            queryset = queryset.filter(image_thumbnail='')
+        recipes = list(queryset.values_list('id', 'image'))
+        for recipe_id, image_name in recipes:
+            generate_variants(recipe_id, image_name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {len(recipes)}'
+        ))
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .timing import collect_timings, get_timings, install_query_timer
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_METRICS = ('db', 'serialize', 'render')
+
+
+class ServerTimingMiddleware:
+    """Замеряет запросы к базе, сериализацию и рендер ответа.
+
+    При SERVER_TIMING замеры отдаются в заголовке Server-Timing каждого
+    ответа. Доля SLOW_REQUEST_SAMPLE_RATE запросов, выполнявшихся дольше
+    SLOW_REQUEST_MS, попадает в лог вместе с самыми частыми повторяющимися
+    SQL-запросами.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING and not settings.SLOW_REQUEST_MS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(install_query_timer)
+        for connection in connections.all():
+            install_query_timer(None, connection)
+
+    def is_sampled(self):
+        return settings.SERVER_TIMING or (
+            settings.SLOW_REQUEST_MS
+            and random.random() < settings.SLOW_REQUEST_SAMPLE_RATE
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+        with collect_timings() as timings:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+        with collect_timings() as timings:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            return self.finish(request, response, timings, start)
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после представления и middleware, поэтому
+        # время рендера считается до post-render callback. Асинхронные
+        # обработчики рендерят ответ сами и замеряют это в своём потоке.
+        timings = get_timings()
+        if timings is not None and not response.is_rendered:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.durations['render'] += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings, start):
+        total = time.perf_counter() - start
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = self.get_header(timings, total)
+        if (
+            settings.SLOW_REQUEST_MS
+            and total * 1000 >= settings.SLOW_REQUEST_MS
+        ):
+            self.log_slow_request(request, timings, total)
+        return response
+
+    def get_header(self, timings, total):
+        metrics = [
+            f'{name};dur={timings.durations[name] * 1000:.1f}'
+            for name in SERVER_TIMING_METRICS
+        ]
+        metrics[0] += f';desc="{timings.queries} queries"'
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def log_slow_request(self, request, timings, total):
+        duplicates = timings.duplicate_statements(
+            settings.SLOW_REQUEST_TOP_QUERIES
+        )
+        lines = [
+            f'Медленный запрос {request.method} {request.get_full_path()}: '
+            f'{total * 1000:.0f} мс, '
+            f'{timings.queries} SQL-запросов за '
+            f'{timings.durations["db"] * 1000:.0f} мс, '
+            f'сериализация {timings.durations["serialize"] * 1000:.0f} мс, '
+            f'рендер {timings.durations["render"] * 1000:.0f} мс'
+        ]
+        if duplicates:
+            lines.append('Повторяющиеся SQL-запросы:')
+            lines.extend(f'{count} x {sql}' for sql, count in duplicates)
+        logger.warning('\n'.join(lines))
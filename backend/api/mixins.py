@@ -0,0 +1,56 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from .timing import timer
+
+
+class SparseFieldsMixin:
+    """Сериализатор, из которого можно убрать лишние поля.
+
+    Аргумент fields оставляет только перечисленные поля, omit убирает
+    перечисленные. Неизвестные имена полей игнорируются.
+    """
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class SparseFieldsViewMixin:
+    """Передаёт в сериализатор поля из параметров ?fields= и ?omit=."""
+
+    sparse_fields_params = ('fields', 'omit')
+
+    def get_sparse_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return {}
+        sparse_fields = {}
+        for param in self.sparse_fields_params:
+            value = self.request.query_params.get(param)
+            if value:
+                sparse_fields[param] = [
+                    name for name in value.split(',') if name
+                ]
+        return sparse_fields
+
+    def is_field_requested(self, name):
+        sparse_fields = self.get_sparse_fields()
+        if name not in sparse_fields.get('fields', (name,)):
+            return False
+        return name not in sparse_fields.get('omit', ())
+
+    def get_serializer(self, *args, **kwargs):
+        for param, value in self.get_sparse_fields().items():
+            kwargs.setdefault(param, value)
+        return super().get_serializer(*args, **kwargs)
+
+
+class TimedSerializerMixin:
+    """Учитывает время сериализации в замерах запроса (Server-Timing)."""
+
+    def to_representation(self, instance):
+        with timer('serialize'):
+            return super().to_representation(instance)
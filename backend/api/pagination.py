@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class ApiPagination(PageNumberPagination):
@@ -8,3 +8,49 @@ class ApiPagination(PageNumberPagination):
 class CustomUserPagination(PageNumberPagination):
     page_size = 1
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class FollowCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    ordering = ('-id',)
+
+
+class CursorOrPageNumberPagination(CustomUserPagination):
+    """Пагинация по номерам страниц или, если передан параметр cursor,
+    по курсору.
+
+    Курсор продолжает выборку с последней записи предыдущей страницы и не
+    считает COUNT(*), поэтому глубокие страницы стоят столько же, сколько
+    первая. Пустой cursor открывает первую страницу.
+    """
+    cursor_pagination_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = self.cursor_pagination_class()
+        # Размер страницы по умолчанию одинаков в обоих режимах.
+        self.cursor_paginator.page_size = self.page_size
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(CursorOrPageNumberPagination):
+    cursor_pagination_class = RecipeCursorPagination
+
+
+class FollowPagination(CursorOrPageNumberPagination):
+    cursor_pagination_class = FollowCursorPagination
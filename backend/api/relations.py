@@ -0,0 +1,147 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from foodgram.db_router import use_primary
+from recipes.counters import RECIPE_COUNTERS, recount_recipes
+from recipes.models import Cart, Favorite, Recipe
+from users.models import Follow
+from users.signals import change_counter
+from .versions import bump_version, bump_version_on_commit, get_version
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (Cart, 'recipe_id'),
+    'follows': (Follow, 'author_id'),
+}
+RELATIONS_KEY = 'relations:{}:{}'
+
+
+def load_relations(user_id):
+    # Множества кешируются под версией, которая сдвигается после коммита в
+    # основную базу: отстающая реплика сохранила бы под новой версией
+    # старые связи.
+    with use_primary():
+        return {
+            name: set(
+                model.objects.filter(user_id=user_id).values_list(
+                    field, flat=True
+                )
+            )
+            for name, (model, field) in RELATIONS.items()
+        }
+
+
+def get_relations(request):
+    """Множества id избранных рецептов, рецептов в корзине и авторов.
+
+    Хранятся в кеше под текущей версией связей пользователя и
+    запоминаются на объекте запроса, чтобы не ходить в кеш на каждый
+    сериализуемый объект.
+    """
+    relations = getattr(request, '_relations', None)
+    if relations is not None:
+        return relations
+    user = request.user
+    if user.is_anonymous:
+        relations = {name: set() for name in RELATIONS}
+    else:
+        version = get_version(f'relations:{user.id}')
+        key = RELATIONS_KEY.format(user.id, version)
+        relations = cache.get(key)
+        if relations is None:
+            relations = load_relations(user.id)
+            cache.set(key, relations, settings.RELATIONS_CACHE_TIMEOUT)
+    request._relations = relations
+    return relations
+
+
+def update_relations(user_id, name, added=(), removed=()):
+    """Обновляет закешированные множества после изменения в базе.
+
+    Новая версия строится только из предыдущей: если между ними
+    вклинилось другое изменение или прошлой версии нет в кеше, множества
+    будут заново загружены из базы при следующем чтении.
+    """
+    version = bump_version(f'relations:{user_id}')
+    previous = cache.get(RELATIONS_KEY.format(user_id, version - 1))
+    if previous is None:
+        return
+    previous[name] = (previous[name] | set(added)) - set(removed)
+    cache.set(
+        RELATIONS_KEY.format(user_id, version),
+        previous,
+        settings.RELATIONS_CACHE_TIMEOUT,
+    )
+
+
+def recipes_relation_changed(model, user_id, recipe_ids, added):
+    """Обновляет кеши после изменений в обход сигналов.
+
+    Счётчики рецептов обновляют вызывающие функции: одиночное изменение
+    сдвигает счётчик на единицу, массовое пересчитывает его.
+    """
+    name = next(
+        name for name, (relation, _) in RELATIONS.items() if relation is model
+    )
+    if added:
+        update_relations(user_id, name, added=recipe_ids)
+    else:
+        update_relations(user_id, name, removed=recipe_ids)
+    if model is Cart:
+        bump_version_on_commit(f'cart:{user_id}')
+
+
+def add_recipe_relation(model, user, recipe_id):
+    """Добавляет рецепт в избранное или корзину одним INSERT ... SELECT.
+
+    Возвращает False, если рецепт уже был добавлен или не существует.
+    """
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(model._meta.db_table)} (user_id, recipe_id) '
+            f'SELECT %s, id FROM {ops.quote_name(Recipe._meta.db_table)} '
+            f'WHERE id = %s '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            (user.id, recipe_id),
+        )
+        added = cursor.rowcount > 0
+    if added:
+        change_counter(Recipe, recipe_id, RECIPE_COUNTERS[model], 1)
+        recipes_relation_changed(model, user.id, [recipe_id], added=True)
+    return added
+
+
+def add_recipe_relations(model, user, recipe_ids):
+    model.objects.bulk_create(
+        (model(user=user, recipe_id=recipe_id) for recipe_id in recipe_ids),
+        ignore_conflicts=True,
+    )
+    # bulk_create с ignore_conflicts не сообщает, какие строки добавлены.
+    recount_recipes(model, recipe_ids)
+    recipes_relation_changed(model, user.id, recipe_ids, added=True)
+
+
+def remove_recipe_relations(model, user, recipe_ids):
+    """Удаляет рецепты одним DELETE и возвращает число удалённых строк."""
+    recipe_ids = list(recipe_ids)
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {ops.quote_name(model._meta.db_table)} '
+            f'WHERE user_id = %s AND recipe_id IN '
+            f'({", ".join(["%s"] * len(recipe_ids))})',
+            (user.id, *recipe_ids),
+        )
+        deleted = cursor.rowcount
+    if not deleted:
+        return deleted
+    if len(recipe_ids) == 1:
+        # Пара пользователь-рецепт уникальна: удалена ровно одна строка.
+        change_counter(Recipe, recipe_ids[0], RECIPE_COUNTERS[model], -1)
+    else:
+        recount_recipes(model, recipe_ids)
+    recipes_relation_changed(model, user.id, recipe_ids, added=False)
+    return deleted
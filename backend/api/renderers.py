@@ -0,0 +1,141 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FileRenderer(BaseRenderer):
+    # Файл формирует само представление, рендерер нужен только для выбора
+    # формата по ?format= и заголовку Accept. Ошибки представление рендерит
+    # через JSON-рендерер.
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class PDFRenderer(FileRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+class PlainTextRenderer(FileRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(FileRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+def is_plain_float(value):
+    # json записывает float через repr: с экспонентой (1e+16, 1e-05) вне
+    # этого диапазона, а orjson - без плюса и ведущего нуля (1e16, 1e-5).
+    # NaN и бесконечность диапазону тоже не принадлежат.
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def has_special_floats(data):
+    """Есть ли в данных float, которые orjson запишет не так, как json."""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float) and not is_plain_float(value):
+            return True
+    return False
+
+
+def declares_floats(serializer):
+    """Объявляет ли сериализатор или вложенные в него поля FloatField."""
+    serializer = getattr(serializer, 'child', serializer)
+    for field in serializer.fields.values():
+        field = getattr(field, 'child', field)
+        if isinstance(field, serializers.FloatField) or (
+            isinstance(field, serializers.BaseSerializer)
+            and declares_floats(field)
+        ):
+            return True
+    return False
+
+
+def may_have_special_floats(data):
+    # Обходить весь ответ дорого, поэтому данные сериализатора проверяются,
+    # только если он объявляет FloatField. У пагинированного ответа
+    # сериализатор - у списка results.
+    serializer = getattr(data, 'serializer', None)
+    if serializer is None and isinstance(data, dict):
+        serializer = getattr(data.get('results'), 'serializer', None)
+    if serializer is not None and not declares_floats(serializer):
+        return False
+    return has_special_floats(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson с тем же выводом, что у JSONRenderer.
+
+    Даты, Decimal, ленивые строки и прочие типы, которые orjson не знает
+    или форматирует иначе, отдаются стандартному кодировщику DRF. Данные с
+    float в экспоненциальной записи, NaN или бесконечностью рендерит
+    JSONRenderer: он пишет экспоненту иначе и не пропускает NaN. Float
+    ищутся только в ответах сериализаторов с полями FloatField и в данных
+    без сериализатора: значения SerializerMethodField и ReadOnlyField не
+    проверяются. Без orjson, а также для отступов и ensure_ascii
+    используется JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            or may_have_special_floats(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = self.encoder_class()
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            # Например, целые больше 64 бит.
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем разделители строк для JavaScript.
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -1,20 +1,27 @@
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
 from users.models import Follow
+from .fields import LimitedBase64ImageField
+from .images import schedule_variants
+from .indexes import recipe_ingredients_index_changed
+from .mixins import SparseFieldsMixin, TimedSerializerMixin
+from .relations import get_relations
 from .serializers_user import CustomUserSerializer
+from .signals import recipe_ingredients_changed
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit',)
@@ -38,8 +45,21 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         ]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+def get_image_url(serializer, recipe):
+    image = recipe.image_thumbnail or recipe.image
+    if not image:
+        return None
+    request = serializer.context.get('request')
+    if request is not None:
+        return request.build_absolute_uri(image.url)
+    return image.url
+
+
+class RecipeSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
+    image = LimitedBase64ImageField()
+    image_webp = serializers.ImageField(read_only=True)
     tags = TagSerializer(read_only=True, many=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientAmountSerializer(
@@ -61,21 +81,31 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_webp',
             'text',
             'cooking_time',
         )
 
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        view = self.context.get('view')
+        if view is not None and view.action in ('list', 'match') and (
+            'image' in data
+        ):
+            data['image'] = get_image_url(self, instance)
+        return data
+
+    def is_related(self, name, obj):
+        request = self.context.get('request')
+        if request is None:
             return False
-        return Recipe.objects.filter(favorites__user=user, id=obj.id).exists()
+        return obj.id in get_relations(request)[name]
+
+    def get_is_favorited(self, obj):
+        return self.is_related('favorites', obj)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Recipe.objects.filter(cart__user=user, id=obj.id).exists()
+        return self.is_related('cart', obj)
 
     def validate_tags(self, data):
         tags = self.initial_data.get('tags')
@@ -93,21 +123,26 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Минимум один ингредиент для рецепта'
             )
-        ingredient_list = []
-        for ingredient_item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient, id=ingredient_item['id']
+        try:
+            ingredient_ids = [int(item['id']) for item in ingredients]
+            amounts = [int(item['amount']) for item in ingredients]
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError(
+                'Укажите id и количество для каждого ингредиента'
             )
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    'Ингредиенты не уникальны'
-                )
-            ingredient_list.append(ingredient)
-            if int(ingredient_item['amount']) <= 0:
-                raise serializers.ValidationError(
-                    'Вес ингридента должен быть больше 0'
-                )
-        return data
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не уникальны'
+            )
+        if any(amount <= 0 for amount in amounts):
+            raise serializers.ValidationError(
+                'Вес ингридента должен быть больше 0'
+            )
+        if len(Ingredient.objects.in_bulk(ingredient_ids)) != len(
+            ingredient_ids
+        ):
+            raise Http404
+        return dict(zip(ingredient_ids, amounts))
 
     def validate_cooking_time(self, data):
         cooking_time = self.initial_data.get('cooking_time')
@@ -144,43 +179,119 @@ class RecipeSerializer(serializers.ModelSerializer):
         return data
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientAmount.objects.create(
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
                 recipe=recipe,
-                ingredient_id=ingredient.get('id'),
-                amount=ingredient.get('amount'),
+                ingredient_id=ingredient_id,
+                amount=amount,
             )
+            for ingredient_id, amount in ingredients.items()
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        current = {
+            ingredient_amount.ingredient_id: ingredient_amount
+            for ingredient_amount in recipe.ingredientamount_set.all()
+        }
+        removed = [
+            ingredient_amount.id
+            for ingredient_id, ingredient_amount in current.items()
+            if ingredient_id not in ingredients
+        ]
+        if removed:
+            IngredientAmount.objects.filter(id__in=removed).delete()
+        changed = []
+        for ingredient_id, amount in ingredients.items():
+            ingredient_amount = current.get(ingredient_id)
+            if ingredient_amount and ingredient_amount.amount != amount:
+                ingredient_amount.amount = amount
+                changed.append(ingredient_amount)
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+        added = {
+            ingredient_id: amount
+            for ingredient_id, amount in ingredients.items()
+            if ingredient_id not in current
+        }
+        if added:
+            self.create_ingredients(added, recipe)
+        if removed or changed or added:
+            recipe_ingredients_changed([recipe.id])
+
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(image=image, **validated_data)
         self.create_ingredients(ingredients_data, recipe)
+        recipe_ingredients_index_changed([recipe.id])
         recipe.tags.set(tags_data)
+        schedule_variants(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         if 'ingredients' in self.initial_data:
             ingredients = validated_data.pop('ingredients')
-            recipe.ingredients.clear()
-            self.create_ingredients(ingredients, recipe)
+            self.update_ingredients(ingredients, recipe)
         if 'tags' in self.initial_data:
             tags_data = validated_data.pop('tags')
             recipe.tags.set(tags_data)
+        if 'image' in validated_data:
+            validated_data['image_thumbnail'] = ''
+            validated_data['image_webp'] = ''
+            recipe = super().update(recipe, validated_data)
+            schedule_variants(recipe)
+            return recipe
         return super().update(recipe, validated_data)
 
 
-class CropRecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+class RecipeMatchSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('coverage', 'missing')
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        # Как и для ?ids=: DELETE передаёт каждый id отдельным параметром.
+        max_length=settings.RECIPES_BATCH_MAX,
+    )
+
+    def validate_recipes(self, value):
+        recipe_ids = list(dict.fromkeys(value))
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        missing = [
+            str(recipe_id) for recipe_id in recipe_ids
+            if recipe_id not in recipes
+        ]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {", ".join(missing)}'
+            )
+        return [recipes[recipe_id] for recipe_id in recipe_ids]
+
+
+class CropRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, obj):
+        return get_image_url(self, obj)
+
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     id = serializers.ReadOnlyField(source='author.id')
     email = serializers.ReadOnlyField(source='author.email')
     username = serializers.ReadOnlyField(source='author.username')
@@ -188,7 +299,7 @@ class FollowSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Follow
@@ -204,15 +315,14 @@ class FollowSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=obj.user, author=obj.author).exists()
+        return True
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[: int(limit)]
+        queryset = getattr(obj, 'author_recipes', None)
+        if queryset is None:
+            request = self.context.get('request')
+            limit = request.GET.get('recipes_limit')
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit:
+                queryset = queryset[: int(limit)]
         return CropRecipeSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
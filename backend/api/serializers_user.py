@@ -2,10 +2,14 @@ from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
-from users.models import Follow, User
+from users.models import User
+from .mixins import SparseFieldsMixin, TimedSerializerMixin
+from .relations import get_relations
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(
+    TimedSerializerMixin, SparseFieldsMixin, UserSerializer
+):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -14,10 +18,10 @@ class CustomUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed',)
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        request = self.context.get('request')
+        if request is None:
             return False
-        return Follow.objects.filter(user=user, author=obj.id).exists()
+        return obj.id in get_relations(request)['follows']
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
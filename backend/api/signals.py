@@ -0,0 +1,121 @@
+import functools
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
+                            Recipe, Tag)
+from recipes.signals import catalog_loaded
+from users.models import Follow
+from .indexes import recipe_ingredients_index_changed
+from .relations import RELATIONS, update_relations
+from .versions import bump_version_on_commit
+
+User = get_user_model()
+
+
+def bump_recipe_versions(recipe_ids):
+    for recipe_id in recipe_ids:
+        bump_version_on_commit(f'recipe:{recipe_id}')
+
+
+def bump_cart_versions(recipe_ids):
+    user_ids = Cart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True).distinct()
+    for user_id in user_ids:
+        bump_version_on_commit(f'cart:{user_id}')
+
+
+def recipe_ingredients_changed(recipe_ids):
+    bump_recipe_versions(recipe_ids)
+    bump_cart_versions(recipe_ids)
+    recipe_ingredients_index_changed(recipe_ids)
+
+
+@receiver((post_save, post_delete), sender=Cart)
+def cart_changed(sender, instance, **kwargs):
+    bump_version_on_commit(f'cart:{instance.user_id}')
+
+
+@receiver((post_save, post_delete), sender=Cart)
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=Follow)
+def relations_changed(sender, instance, signal, **kwargs):
+    for name, (model, field) in RELATIONS.items():
+        if model is sender:
+            changed = (getattr(instance, field),)
+            if signal is post_save:
+                update = functools.partial(
+                    update_relations, instance.user_id, name, added=changed
+                )
+            else:
+                update = functools.partial(
+                    update_relations, instance.user_id, name, removed=changed
+                )
+            transaction.on_commit(update)
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def ingredient_amount_changed(sender, instance, **kwargs):
+    recipe_ingredients_changed([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    bump_recipe_versions([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_recipe_versions([instance.pk])
+    elif pk_set:
+        bump_recipe_versions(pk_set)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    bump_recipe_versions(
+        Recipe.objects.filter(author=instance).values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        bump_version_on_commit(f'token:{key}')
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    bump_version_on_commit(f'token:{instance.key}')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_version_on_commit('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_version_on_commit('tags')
+
+
+@receiver(catalog_loaded)
+def catalog_reloaded(sender, **kwargs):
+    if sender is Ingredient:
+        bump_version_on_commit('ingredients')
+    elif sender is Tag:
+        bump_version_on_commit('tags')
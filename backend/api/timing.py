@@ -0,0 +1,80 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Замеры текущего запроса. Переменная контекста копируется в потоки
+# асинхронных обработчиков, поэтому запросы к базе из пула попадают в те же
+# замеры.
+_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = Counter()
+        self.queries = 0
+        self.statements = Counter()
+        self.running = set()
+
+    @contextmanager
+    def measure(self, name):
+        # Вложенные замеры с тем же именем (вложенные сериализаторы) не
+        # учитываются дважды.
+        if name in self.running:
+            yield
+            return
+        self.running.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            self.running.discard(name)
+
+    def duplicate_statements(self, limit):
+        return [
+            (sql, count)
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+@contextmanager
+def collect_timings():
+    timings = RequestTimings()
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def get_timings():
+    return _timings.get()
+
+
+@contextmanager
+def timer(name):
+    """Замеряет блок кода, если для текущего запроса собираются замеры."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    with timings.measure(name):
+        yield
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    # Текст без параметров: одинаковые запросы с разными id - признак N+1.
+    timings.queries += 1
+    timings.statements[sql] += 1
+    with timings.measure('db'):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -10,8 +10,12 @@ router.register('tags', TagsViewSet)
 router.register('ingredients', IngredientsViewSet)
 router.register('recipes', RecipeViewSet)
 
-urlpatterns = [
-    path('', include(router.urls)),
+auth_urlpatterns = [
     path('users/me/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+urlpatterns = [
+    path('', include(router.urls)),
+    *auth_urlpatterns,
+]
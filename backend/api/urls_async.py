@@ -0,0 +1,21 @@
+from django.urls import include, path
+
+from .urls import auth_urlpatterns, router
+from .views_async import async_patterns
+
+# Основные эндпоинты для чтения обслуживаются асинхронно, остальные
+# маршруты остаются синхронными.
+ASYNC_VIEWS = (
+    'recipe-list',
+    'recipe-detail',
+    'ingredient-list',
+    'ingredient-detail',
+    'tag-list',
+    'tag-detail',
+    'user-subscriptions',
+)
+
+urlpatterns = [
+    path('', include(async_patterns(router.urls, ASYNC_VIEWS))),
+    *auth_urlpatterns,
+]
@@ -1,48 +1,147 @@
-from django.http import HttpResponse
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+import csv
+import io
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from recipes.models import IngredientAmount
+from foodgram.db_router import use_primary
+from recipes.models import IngredientAmount, Recipe
 
+from .versions import get_version
 
-def get_shopping_cart(request):
-    final_list = {}
-    ingredients = IngredientAmount.objects.filter(
-        recipe__cart__user=request.user
-    ).values_list(
-        'ingredient__name', 'ingredient__measurement_unit', 'amount'
-    )
-    for item in ingredients:
-        name = item[0]
-        if name not in final_list:
-            final_list[name] = {
-                'measurement_unit': item[1],
-                'amount': item[2],
-            }
-        else:
-            final_list[name]['amount'] += item[2]
-    pdfmetrics.registerFont(
-        TTFont('Arial', 'arial.ttf', 'UTF-8')
-    )
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = (
-        'attachment; ' 'filename="shopping_list.pdf"'
-    )
-    page = canvas.Canvas(response)
+SHOPPING_LIST_BOTTOM_MARGIN = 50
+
+
+def get_recipes_by_author(author_ids, limit=None):
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is not None:
+        ranked = queryset.annotate(
+            recipe_rank=Window(
+                RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        ).values('id', 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) ranked WHERE recipe_rank <= %s',
+            (*params, limit),
+        ))
+    recipes = defaultdict(list)
+    for recipe in queryset.only(
+        'id', 'name', 'image', 'image_thumbnail', 'cooking_time', 'author_id'
+    ):
+        recipes[recipe.author_id].append(recipe)
+    return recipes
+
+
+def get_shopping_list(user):
+    return IngredientAmount.objects.filter(
+        recipe__cart__user=user
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(
+        total=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def render_shopping_list(items):
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
     page.setFont('Arial', size=24)
     page.drawString(200, 800, 'Список ингредиентов')
     page.setFont('Arial', size=16)
     height = 750
-    for i, (name, data) in enumerate(final_list.items(), 1):
+    for i, item in enumerate(items, 1):
+        if height < SHOPPING_LIST_BOTTOM_MARGIN:
+            page.showPage()
+            page.setFont('Arial', size=16)
+            height = 800
         page.drawString(
             75,
             height,
             (
-                f'{i}  {name} - {data["amount"]} '
-                f'{data["measurement_unit"]}'
+                f'{i}  {item["ingredient__name"]} - {item["total"]} '
+                f'{item["ingredient__measurement_unit"]}'
             ),
         )
         height -= 25
     page.showPage()
     page.save()
+    return buffer.getvalue()
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_shopping_list_txt(items):
+    yield 'Список ингредиентов\n\n'
+    for i, item in enumerate(items, 1):
+        yield (
+            f'{i}. {item["ingredient__name"]} - {item["total"]} '
+            f'{item["ingredient__measurement_unit"]}\n'
+        )
+
+
+def stream_shopping_list_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in items:
+        yield writer.writerow((
+            item['ingredient__name'],
+            item['ingredient__measurement_unit'],
+            item['total'],
+        ))
+
+
+SHOPPING_LIST_STREAMS = {
+    'txt': stream_shopping_list_txt,
+    'csv': stream_shopping_list_csv,
+}
+
+
+def get_shopping_list_pdf(user):
+    cache_key = (
+        f'shopping-list:{user.id}:{get_version(f"cart:{user.id}")}:'
+        f'{get_version("ingredients")}'
+    )
+    content = cache.get(cache_key)
+    if content is None:
+        # Версия корзины уже сдвинута коммитом в основную базу, отстающая
+        # реплика вернула бы старый список.
+        with use_primary():
+            content = render_shopping_list(get_shopping_list(user))
+        cache.set(
+            cache_key, content, settings.SHOPPING_LIST_CACHE_TIMEOUT
+        )
+    return content
+
+
+def get_shopping_cart(request):
+    renderer = request.accepted_renderer
+    if renderer.format in SHOPPING_LIST_STREAMS:
+        # Строки уже сложены по ингредиентам, их немного. Читаем их здесь:
+        # обработчик ASGI перебирает потоковый ответ в цикле событий, где
+        # запросы к базе запрещены.
+        items = list(get_shopping_list(request.user))
+        response = StreamingHttpResponse(
+            SHOPPING_LIST_STREAMS[renderer.format](items),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+    else:
+        response = HttpResponse(
+            get_shopping_list_pdf(request.user),
+            content_type=renderer.media_type,
+        )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_list.{renderer.format}"'
+    )
     return response
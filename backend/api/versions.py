@@ -0,0 +1,65 @@
+import functools
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+MODIFIED_KEY = 'modified:{}'
+
+
+def initial_version():
+    # Счётчик стартует с текущего времени, чтобы после вытеснения ключа
+    # из кеша новая версия не совпала с одной из уже выданных.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    return cache.get_or_set(VERSION_KEY.format(name), initial_version, None)
+
+
+def get_versions(*names):
+    keys = [VERSION_KEY.format(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_last_modified(*names):
+    """Время последнего изменения самой свежей из версий.
+
+    Если отметки нет в кеше, изменением считается текущий момент: так
+    If-Modified-Since никогда не вернёт 304 для устаревших данных.
+    """
+    now = time.time()
+    keys = [MODIFIED_KEY.format(name) for name in names]
+    modified = cache.get_many(keys)
+    for key in keys:
+        if key not in modified:
+            cache.add(key, now, None)
+            modified[key] = now
+    return datetime.fromtimestamp(max(modified.values()), tz=timezone.utc)
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    cache.set(MODIFIED_KEY.format(name), time.time(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def bump_version_on_commit(name):
+    """Сдвигает версию после коммита текущей транзакции.
+
+    Иначе параллельный запрос между сдвигом и коммитом получит новую версию
+    со старыми данными и закеширует их до следующего изменения.
+    """
+    transaction.on_commit(functools.partial(bump_version, name))
@@ -0,0 +1,70 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from .timing import timer
+
+
+@functools.lru_cache(maxsize=None)
+def get_executor(max_workers):
+    return ThreadPoolExecutor(max_workers, thread_name_prefix='api-db')
+
+
+def run_view(view, request, *args, **kwargs):
+    # Поток пула живёт дольше запроса: подключения закрываются и проверяются
+    # так же, как сигналы request_started и request_finished делают это в
+    # синхронном обработчике.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # Рендерим здесь, чтобы сериализация не заняла поток Django для
+        # синхронного кода.
+        if hasattr(response, 'render'):
+            with timer('render'):
+                response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """Асинхронная обёртка над синхронным представлением DRF.
+
+    Представление выполняется в пуле из ASYNC_DB_WORKERS потоков, поэтому
+    одновременных обращений к базе не больше, чем потоков, а медленный запрос
+    не блокирует остальные. Контекст (в том числе выбор реплики) передаётся в
+    поток вместе с вызовом.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(settings.ASYNC_DB_WORKERS),
+            functools.partial(
+                context.run, run_view, view, request, *args, **kwargs
+            ),
+        )
+    return wrapper
+
+
+def async_patterns(patterns, names):
+    """Маршруты, в которых представления с перечисленными именами асинхронны.
+
+    Порядок маршрутов сохраняется: действия роутера вроде
+    recipes/download_shopping_cart/ должны проверяться раньше карточки.
+    """
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_view(pattern.callback),
+            pattern.default_args,
+            pattern.name,
+        )
+        if pattern.name in names else pattern
+        for pattern in patterns
+    ]
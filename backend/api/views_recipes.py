@@ -1,26 +1,110 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from recipes.models import (Cart, Favorite, Ingredient,
+from foodgram.db_router import use_primary
+from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
                             Recipe, Tag)
 
 from .filters import IngredientSearchFilter, AuthorAndTagFilter
-from .pagination import CustomUserPagination
+from .indexes import ingredient_index, recipe_ingredient_index
+from .mixins import SparseFieldsViewMixin
+from .pagination import CustomUserPagination, RecipePagination
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
+from .relations import (add_recipe_relation, add_recipe_relations,
+                        remove_recipe_relations)
+from .renderers import (CSVRenderer, FastJSONRenderer, PDFRenderer,
+                        PlainTextRenderer)
 from .serializers_recipes import (CropRecipeSerializer, IngredientSerializer,
+                                  RecipeIdsSerializer, RecipeMatchSerializer,
                                   RecipeSerializer, TagSerializer)
 from .utils import get_shopping_cart
+from .versions import get_last_modified, get_versions
 
 
+def versioned_condition(etag_func, last_modified_func):
+    """condition() для ответов, чей ETag строится из версий в кеше.
+
+    Версии сдвигаются после коммита в основную базу, а реплика может
+    отставать: старые данные с неё закешировались бы клиентом под новым
+    ETag. Поэтому такие ответы всегда читаются с основной базы.
+    """
+    def decorator(view):
+        return use_primary()(condition(
+            etag_func=etag_func, last_modified_func=last_modified_func
+        )(view))
+    return decorator
+
+
+def catalog_condition(name):
+    def etag(request, *args, **kwargs):
+        version, = get_versions(name)
+        return f'{name}-{version}-{request.accepted_renderer.format}'
+
+    def last_modified(request, *args, **kwargs):
+        return get_last_modified(name)
+
+    return versioned_condition(etag, last_modified)
+
+
+def recipe_version_names(request, pk):
+    names = [f'recipe:{pk}', 'tags', 'ingredients']
+    if request.user.is_authenticated:
+        names.append(f'relations:{request.user.id}')
+    return names
+
+
+def recipe_etag(request, pk=None):
+    versions = '-'.join(
+        str(version)
+        for version in get_versions(*recipe_version_names(request, pk))
+    )
+    # Запятые в ETag ломают разбор If-None-Match.
+    sparse_fields = '-'.join(
+        request.query_params.get(param, '').replace(',', '.')
+        for param in ('fields', 'omit')
+    )
+    return (
+        f'recipe-{pk}-{request.user.id}-{versions}-'
+        f'{request.accepted_renderer.format}-{sparse_fields}'
+    )
+
+
+def recipe_last_modified(request, pk=None):
+    return get_last_modified(*recipe_version_names(request, pk))
+
+
+def get_ids_param(request, name):
+    """id из параметра вида ?name=1,2&name=3 с сохранением порядка."""
+    ids = {}
+    try:
+        for value in request.query_params.getlist(name):
+            ids.update(
+                (int(item), None) for item in value.split(',') if item
+            )
+    except ValueError:
+        raise ValidationError({name: 'Укажите id числами через запятую'})
+    return list(ids)
+
+
+@method_decorator(catalog_condition('tags'), name='list')
+@method_decorator(catalog_condition('tags'), name='retrieve')
 class TagsViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
 
 
+@method_decorator(catalog_condition('ingredients'), name='retrieve')
 class IngredientsViewSet(viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -28,16 +112,76 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
 
+    @method_decorator(catalog_condition('ingredients'))
+    def list(self, request, *args, **kwargs):
+        terms = IngredientSearchFilter().get_search_terms(request)
+        if terms:
+            return Response(ingredient_index.search(terms))
+        return super().list(request, *args, **kwargs)
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsOwnerOrReadOnly,)
-    pagination_class = CustomUserPagination
+    pagination_class = RecipePagination
     filter_class = AuthorAndTagFilter
 
+    def handle_exception(self, exc):
+        # Ошибки скачивания списка покупок - JSON, а не выбранный формат
+        # файла.
+        if self.action == 'download_shopping_cart':
+            renderer = FastJSONRenderer()
+            self.request.accepted_renderer = renderer
+            self.request.accepted_media_type = renderer.media_type
+        return super().handle_exception(exc)
+
+    def get_queryset(self):
+        # Не загружаем связи и тяжёлые поля, которые клиент не запросил.
+        queryset = Recipe.objects.defer('search_vector')
+        if self.is_field_requested('author'):
+            queryset = queryset.select_related('author')
+        if self.is_field_requested('tags'):
+            queryset = queryset.prefetch_related('tags')
+        if self.is_field_requested('ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related('ingredient'),
+            ))
+        if not self.is_field_requested('text'):
+            queryset = queryset.defer('text')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        recipe_ids = get_ids_param(request, 'ids')
+        if len(recipe_ids) > settings.RECIPES_BATCH_MAX:
+            raise ValidationError({
+                'ids': f'Не больше {settings.RECIPES_BATCH_MAX} рецептов '
+                       f'за запрос'
+            })
+        recipes = self.get_queryset().in_bulk(recipe_ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @method_decorator(
+        versioned_condition(recipe_etag, recipe_last_modified)
+    )
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        serializer.instance = self.get_queryset().get(pk=recipe.pk)
+
+    def perform_update(self, serializer):
+        recipe = serializer.save()
+        serializer.instance = self.get_queryset().get(pk=recipe.pk)
 
     @action(
         detail=True,
@@ -62,27 +206,94 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.delete_obj(Cart, request.user, pk)
 
     @action(
-        detail=False, methods=['get'], permission_classes=(IsAuthenticated,)
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PDFRenderer, PlainTextRenderer, CSVRenderer),
     )
     def download_shopping_cart(self, request):
         return get_shopping_cart(request)
 
+    @action(detail=False, pagination_class=CustomUserPagination)
+    def match(self, request):
+        ingredient_ids = get_ids_param(request, 'ingredients')
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Укажите ингредиенты'})
+        page = self.paginate_queryset(
+            recipe_ingredient_index.match(ingredient_ids)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, matched, total in page:
+            recipe = recipes.get(recipe_id)
+            # Рецепт мог быть удалён после построения индекса.
+            if recipe is None:
+                continue
+            recipe.coverage = matched / total
+            recipe.missing = total - matched
+            results.append(recipe)
+        serializer = RecipeMatchSerializer(
+            results,
+            many=True,
+            context=self.get_serializer_context(),
+            **self.get_sparse_fields(),
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite',
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_obj(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_obj(Cart, request)
+
     def add_obj(self, model, user, pk):
-        if model.objects.filter(user=user, recipe__id=pk).exists():
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if not add_recipe_relation(model, user, recipe_id):
+            get_object_or_404(Recipe, id=recipe_id)
             return Response(
                 {'Рецепт уже добавлен в список'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        recipe = get_object_or_404(Recipe, id=pk)
-        model.objects.create(user=user, recipe=recipe)
+        recipe = get_object_or_404(Recipe, id=recipe_id)
         serializer = CropRecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_obj(self, model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if remove_recipe_relations(model, user, [recipe_id]):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'Рецепт уже удален'}, status=status.HTTP_400_BAD_REQUEST
         )
+
+    def bulk_obj(self, model, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        recipe_ids = [recipe.id for recipe in recipes]
+        if request.method == 'DELETE':
+            remove_recipe_relations(model, request.user, recipe_ids)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        add_recipe_relations(model, request.user, recipe_ids)
+        serializer = CropRecipeSerializer(recipes, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
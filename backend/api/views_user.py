@@ -7,13 +7,14 @@ from rest_framework.response import Response
 
 from users.models import Follow, User
 
-from .pagination import CustomUserPagination
+from .mixins import SparseFieldsViewMixin
+from .pagination import CustomUserPagination, FollowPagination
 from .serializers_recipes import FollowSerializer
 from .permissions import IsOwnerOrReadOnly
-from .serializers_user import Follow
+from .utils import get_recipes_by_author
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SparseFieldsViewMixin, UserViewSet):
     pagination_class = CustomUserPagination
     permission_classes = (IsOwnerOrReadOnly,)
 
@@ -59,12 +60,27 @@ class CustomUserViewSet(UserViewSet):
             {'errors': 'Вы уже отписались'}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    @action(detail=False, permission_classes=(IsAuthenticated,))
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FollowPagination,
+    )
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = Follow.objects.filter(user=user).select_related('author')
         pages = self.paginate_queryset(queryset)
+        if self.is_field_requested('recipes'):
+            limit = request.query_params.get('recipes_limit')
+            recipes = get_recipes_by_author(
+                [follow.author_id for follow in pages],
+                int(limit) if limit else None,
+            )
+            for follow in pages:
+                follow.author_recipes = recipes[follow.author_id]
         serializer = FollowSerializer(
-            pages, many=True, context={'request': request}
+            pages,
+            many=True,
+            context={'request': request},
+            **self.get_sparse_fields(),
         )
         return self.get_paginated_response(serializer.data)
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'db-pin:{}'
+# Модели, которые читаются только с основной базы: токен нужен сразу после
+# входа, когда реплика могла его ещё не получить.
+PRIMARY_MODELS = ('authtoken.Token',)
+
+# По умолчанию всё идёт в основную базу: реплики включает только
+# middleware для безопасных запросов.
+_use_primary = ContextVar('use_primary', default=True)
+
+
+@contextmanager
+def use_primary():
+    """Читать с основной базы внутри блока, например при заполнении
+    общих кешей, которые не должны застать отставание реплики."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or _use_primary.get()
+            or model._meta.label in PRIMARY_MODELS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет безопасные запросы на реплики, а остальные - в основную
+    базу.
+
+    После изменяющего запроса клиент на DATABASE_PIN_SECONDS закрепляется за
+    основной базой, чтобы сразу видеть свои изменения (избранное, корзину).
+    Клиент определяется по хешу заголовка Authorization.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Под ASGI Django должен видеть middleware как корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def get_pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return PIN_KEY.format(
+            hashlib.sha256(authorization.encode()).hexdigest()
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        pin_key = self.get_pin_key(request)
+        safe = request.method in SAFE_METHODS
+        use_replica = safe and not (pin_key and cache.get(pin_key))
+        token = _use_primary.set(not use_replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        if not safe and pin_key:
+            cache.set(pin_key, True, settings.DATABASE_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        pin_key = self.get_pin_key(request)
+        safe = request.method in SAFE_METHODS
+        use_replica = safe and not (
+            pin_key
+            and await sync_to_async(cache.get, thread_sensitive=False)(pin_key)
+        )
+        # Переменная контекста копируется в потоки асинхронных обработчиков.
+        token = _use_primary.set(not use_replica)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        if not safe and pin_key:
+            await sync_to_async(cache.set, thread_sensitive=False)(
+                pin_key, True, settings.DATABASE_PIN_SECONDS
+            )
+        return response
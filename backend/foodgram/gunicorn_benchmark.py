@@ -0,0 +1,29 @@
+"""Настройки gunicorn для benchmark_asgi.
+
+Добавляют к каждому SQL-запросу в рабочих процессах задержку
+BENCHMARK_DB_LATENCY миллисекунд: сеть до базы, которой нет у SQLite.
+"""
+
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+LATENCY = float(os.environ.get('BENCHMARK_DB_LATENCY', 0)) / 1000
+
+
+def delay(execute, sql, params, many, context):
+    time.sleep(LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_delay(sender, connection, **kwargs):
+    if delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(delay)
+
+
+def post_worker_init(worker):
+    # Подключения создаются в потоках, которые обрабатывают запросы, уже
+    # после запуска рабочего процесса.
+    if LATENCY:
+        connection_created.connect(add_delay)
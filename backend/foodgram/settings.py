@@ -25,6 +25,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
+    'foodgram.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,7 +36,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+# foodgram/asgi.py подставляет foodgram.urls_async с асинхронными
+# обработчиками основных эндпоинтов для чтения.
+ROOT_URLCONF = os.environ.get('ROOT_URLCONF', 'foodgram.urls')
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
@@ -55,6 +59,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
 
 
 if DEBUG is True:
@@ -76,6 +81,31 @@ else:
         }
     }
 
+# Реплики только для чтения: DB_REPLICAS=host1,host2 создаёт подключения
+# replica1, replica2 с настройками основной базы и другим хостом. Для SQLite
+# реплика - второе подключение к тому же файлу.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['foodgram.db_router.PrimaryReplicaRouter']
+DATABASE_PIN_SECONDS = int(os.environ.get('DATABASE_PIN_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -129,7 +159,16 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -149,3 +188,28 @@ DJOSER = {
 }
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+RELATIONS_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPES_BATCH_MAX = 100
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+# Потоки, в которых асинхронные обработчики обращаются к базе. Каждый поток
+# держит своё подключение к каждой базе, поэтому число подключений процесса
+# не превышает ASYNC_DB_WORKERS * (1 + len(DATABASE_REPLICAS)).
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', 8))
+
+# Заголовок Server-Timing с числом и временем SQL-запросов, временем
+# сериализации и рендера. Медленные запросы (SLOW_REQUEST_MS, 0 - не
+# логировать) выборочно пишутся в лог api.middleware с повторяющимися
+# SQL-запросами.
+SERVER_TIMING = bool(int(os.environ.get('SERVER_TIMING', 0)))
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+SLOW_REQUEST_SAMPLE_RATE = float(
+    os.environ.get('SLOW_REQUEST_SAMPLE_RATE', 0.1)
+)
+SLOW_REQUEST_TOP_QUERIES = 5
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_WORKERS = 2
+IMAGE_THUMBNAIL_SIZE = (400, 400)
+IMAGE_WEBP_QUALITY = 80
@@ -20,13 +20,14 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'author', 'favorite_count')
+    list_display = (
+        'pk', 'name', 'author', 'favorites_count', 'in_carts_count'
+    )
+    list_select_related = ('author',)
     search_fields = ('name', 'author', 'tags')
     list_filter = ('name', 'author', 'tags')
     empty_value_display = '-empty-'
-
-    def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
 
 @admin.register(Cart)
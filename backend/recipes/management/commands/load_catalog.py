@@ -0,0 +1,98 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Ingredient, Tag
+from recipes.signals import catalog_loaded
+
+CATALOGS = {
+    'ingredients': (
+        Ingredient,
+        ('name', 'measurement_unit'),
+        ('name', 'measurement_unit'),
+    ),
+    'tags': (Tag, ('name', 'color', 'slug'), ('slug',)),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает каталог ингредиентов или тегов из CSV/JSON-файлов. '
+        'Повторный запуск не создаёт дубликатов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='CSV или JSON файлы')
+        parser.add_argument(
+            '--model',
+            choices=sorted(CATALOGS),
+            default='ingredients',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        model, fields, unique_fields = CATALOGS[options['model']]
+        start = time.perf_counter()
+        seen = set()
+        objects = []
+        read = 0
+        for path in options['paths']:
+            for row in self.read_rows(path, fields):
+                read += 1
+                values = {
+                    field: (row.get(field) or '').strip() for field in fields
+                }
+                key = tuple(values[field] for field in unique_fields)
+                if not all(key) or key in seen:
+                    continue
+                seen.add(key)
+                objects.append(model(**values))
+
+        with transaction.atomic():
+            before = model.objects.count()
+            model.objects.bulk_create(
+                objects,
+                batch_size=options['batch_size'],
+                ignore_conflicts=True,
+            )
+            created = model.objects.count() - before
+            if created:
+                transaction.on_commit(
+                    lambda: catalog_loaded.send(sender=model)
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.model_name}: прочитано {read}, '
+            f'уникальных {len(objects)}, добавлено {created} '
+            f'за {time.perf_counter() - start:.3f} с'
+        ))
+
+    def read_rows(self, path, fields):
+        extension = os.path.splitext(path)[1].lower()
+        try:
+            with open(path, encoding='utf-8') as file:
+                if extension == '.json':
+                    yield from json.load(file)
+                elif extension == '.csv':
+                    yield from self.read_csv(file, fields)
+                else:
+                    raise CommandError(f'Неизвестный формат файла: {path}')
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+    def read_csv(self, file, fields):
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        if set(fields) <= set(header):
+            fieldnames = header
+        else:
+            fieldnames = fields
+            yield dict(zip(fieldnames, header))
+        for row in reader:
+            yield dict(zip(fieldnames, row))
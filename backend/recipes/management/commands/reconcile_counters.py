@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipes.counters import actual_count
+from recipes.models import Cart, Favorite, Recipe
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', Cart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики избранного, корзин, '
+        'рецептов и подписчиков и исправляет расхождения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения',
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in COUNTERS:
+            actual = actual_count(related_model, related_field)
+            with transaction.atomic():
+                drifted = model.objects.annotate(actual=actual).exclude(
+                    **{field: F('actual')}
+                ).values_list('pk', flat=True)
+                if options['dry_run']:
+                    fixed = drifted.count()
+                else:
+                    fixed = model.objects.filter(
+                        pk__in=list(drifted)
+                    ).update(**{field: actual})
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: расхождений {fixed}'
+            )
@@ -0,0 +1,53 @@
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        extra_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=duplicate['keep_id']).values_list('id', flat=True))
+        for extra_id in extra_ids:
+            recipes_with_kept = IngredientAmount.objects.filter(
+                ingredient_id=duplicate['keep_id']
+            ).values('recipe_id')
+            # В рецепте есть оба ингредиента: количество дубликата
+            # прибавляется к оставшейся строке, а не теряется при удалении.
+            for amount in IngredientAmount.objects.filter(
+                ingredient_id=extra_id, recipe_id__in=recipes_with_kept
+            ):
+                IngredientAmount.objects.filter(
+                    ingredient_id=duplicate['keep_id'],
+                    recipe_id=amount.recipe_id,
+                ).update(amount=F('amount') + amount.amount)
+            IngredientAmount.objects.filter(
+                ingredient_id=extra_id
+            ).exclude(recipe_id__in=recipes_with_kept).update(
+                ingredient_id=duplicate['keep_id']
+            )
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique ingredient measurement unit'),
+        ),
+    ]
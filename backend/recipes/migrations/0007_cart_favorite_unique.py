@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_for(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe'
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def remove_duplicates(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name in ('Cart', 'Favorite'):
+        model = apps.get_model('recipes', model_name)
+        duplicates = model.objects.values('user', 'recipe').order_by().annotate(
+            first_id=Min('id'), total=Count('id')
+        ).filter(total__gt=1)
+        for duplicate in duplicates:
+            model.objects.filter(
+                user=duplicate['user'], recipe=duplicate['recipe']
+            ).exclude(id=duplicate['first_id']).delete()
+    Recipe.objects.update(
+        favorites_count=count_for(apps.get_model('recipes', 'Favorite')),
+        in_carts_count=count_for(apps.get_model('recipes', 'Cart')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique cart user'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique favorite recipe for user'),
+        ),
+    ]
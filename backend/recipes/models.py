@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.db import models
 
@@ -22,6 +23,12 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit',),
+                name='unique ingredient measurement unit',
+            ),
+        )
 
 
 class Recipe(models.Model):
@@ -40,6 +47,16 @@ class Recipe(models.Model):
     )
     name = models.CharField(verbose_name='Название', max_length=100)
     image = models.ImageField(verbose_name='Изображение', upload_to='recipes/')
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/thumbnails/',
+        blank=True,
+    )
+    image_webp = models.ImageField(
+        verbose_name='Изображение WebP',
+        upload_to='recipes/webp/',
+        blank=True,
+    )
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveSmallIntegerField(
         validators=(validators.MinValueValidator(1),),
@@ -48,9 +65,28 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         'date published', auto_now_add=True, db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False,
+    )
+    # Заполняется сигналом после сохранения; GIN-индекс создаётся
+    # миграцией только в PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+        )
 
 
 class IngredientAmount(models.Model):
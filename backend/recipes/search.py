@@ -0,0 +1,93 @@
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Recipe
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+# Вес названия в bm25 выше, чем у описания, как и веса A/B в PostgreSQL.
+FTS_RANK = f'bm25({FTS_TABLE}, 10.0, 1.0)'
+
+search_vector = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+)
+
+
+def get_terms(query):
+    return re.findall(r'\w+', query)
+
+
+def update_search_index(recipe_ids):
+    """Пересчитывает поисковый индекс для перечисленных рецептов."""
+    recipe_ids = list(recipe_ids)
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=search_vector
+        )
+    elif connection.vendor == 'sqlite':
+        delete_from_search_index(recipe_ids)
+        with connection.cursor() as cursor:
+            for start in range(0, len(recipe_ids), 500):
+                batch = recipe_ids[start:start + 500]
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                    f'SELECT id, name, text FROM recipes_recipe '
+                    f'WHERE id IN ({", ".join(["%s"] * len(batch))})',
+                    batch,
+                )
+
+
+def delete_from_search_index(recipe_ids):
+    # В PostgreSQL вектор хранится в самой строке рецепта.
+    if connection.vendor != 'sqlite':
+        return
+    recipe_ids = list(recipe_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(recipe_ids), 500):
+            batch = recipe_ids[start:start + 500]
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} '
+                f'WHERE rowid IN ({", ".join(["%s"] * len(batch))})',
+                batch,
+            )
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по тексту запроса и сортирует по релевантности.
+
+    В PostgreSQL используется проиндексированный search_vector, в SQLite -
+    таблица FTS5 с ранжированием bm25. На других базах остаётся поиск
+    подстроки без ранжирования.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            ' '.join(terms), config=SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-pub_date', '-id')
+    if connection.vendor == 'sqlite':
+        # Соединение с FTS-таблицей: bm25 считается один раз на строку,
+        # а не в коррелированном подзапросе.
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        return queryset.extra(
+            select={'search_rank': FTS_RANK},
+            tables=(FTS_TABLE,),
+            where=(
+                f'{FTS_TABLE} MATCH %s',
+                f'{FTS_TABLE}.rowid = recipes_recipe.id',
+            ),
+            params=(match,),
+        ).order_by('search_rank', '-pub_date', '-id')
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(text__icontains=term)
+    return queryset.filter(condition)
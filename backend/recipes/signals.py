@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from users.models import User
+from users.signals import change_counter
+from .counters import RECIPE_COUNTERS
+from .models import Cart, Favorite, Recipe
+from .search import delete_from_search_index, update_search_index
+
+catalog_loaded = Signal()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Cart)
+def recipe_relation_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counter(
+            Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Cart)
+def recipe_relation_deleted(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_changed(sender, instance, raw, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed_from_search(sender, instance, **kwargs):
+    delete_from_search_index([instance.pk])
@@ -0,0 +1,95 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Версии и кеши связей живут в locmem-кеше и переживают откат базы.
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        email='cook@foodgram.ru',
+        username='cook',
+        first_name='Иван',
+        last_name='Поваров',
+        password='pass12345',
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        email='guest@foodgram.ru',
+        username='guest',
+        first_name='Пётр',
+        last_name='Гостев',
+        password='pass12345',
+    )
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+def authorized_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def user_client(user):
+    return authorized_client(user)
+
+
+@pytest.fixture
+def another_client(another_user):
+    return authorized_client(another_user)
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=slug, color='#E26C2D', slug=slug)
+        for slug in ('breakfast', 'lunch')
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit='г')
+        for name in ('мука', 'сахар', 'соль')
+    ]
+
+
+@pytest.fixture
+def make_recipe(user, tags, ingredients):
+    def make_recipe(name='Блины', author=None, amounts=(200, 50)):
+        recipe = Recipe.objects.create(
+            author=author or user,
+            name=name,
+            image='recipes/test.png',
+            text='Описание',
+            cooking_time=20,
+        )
+        recipe.tags.set(tags[:1])
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+            for ingredient, amount in zip(ingredients, amounts)
+        )
+        return recipe
+    return make_recipe
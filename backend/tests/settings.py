@@ -0,0 +1,26 @@
+import tempfile
+
+from foodgram.settings import *  # noqa: F401,F403
+
+SECRET_KEY = 'tests'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-tests-')
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+SERVER_TIMING = False
+SLOW_REQUEST_MS = 0
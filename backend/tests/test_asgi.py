@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from django.core.asgi import get_asgi_application
+from django.urls import Resolver404, get_resolver, resolve
+
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Cart
+
+SYNC_URLCONF = 'foodgram.urls'
+ASYNC_URLCONF = 'foodgram.urls_async'
+
+
+def get_paths(urlconf):
+    # Пути всех именованных маршрутов с единицей вместо каждого параметра.
+    resolver = get_resolver(urlconf)
+    for name in resolver.reverse_dict:
+        if not isinstance(name, str):
+            continue
+        for possibilities, *_ in resolver.reverse_dict.getlist(name):
+            for template, params in possibilities:
+                yield '/' + template % dict.fromkeys(params, '1')
+
+
+def get_url_name(path, urlconf):
+    try:
+        return resolve(path, urlconf).url_name
+    except Resolver404:
+        return None
+
+
+def test_async_urls_resolve_like_sync_urls():
+    paths = sorted(set(get_paths(SYNC_URLCONF)))
+    assert '/api/recipes/download_shopping_cart/' in paths
+    assert [
+        (path, get_url_name(path, ASYNC_URLCONF)) for path in paths
+    ] == [
+        (path, get_url_name(path, SYNC_URLCONF)) for path in paths
+    ]
+
+
+@pytest.mark.parametrize('path, url_name', (
+    ('/api/recipes/download_shopping_cart/', 'recipe-download-shopping-cart'),
+    ('/api/recipes/match/', 'recipe-match'),
+    ('/api/recipes/favorite/', 'recipe-favorite-bulk'),
+    (
+        '/api/recipes/shopping_cart/', 'recipe-shopping-cart-bulk'
+    ),
+    ('/api/recipes/1/', 'recipe-detail'),
+))
+def test_recipe_actions_resolve_before_detail(path, url_name):
+    assert get_url_name(path, ASYNC_URLCONF) == url_name
+
+
+def asgi_get(path, token, query_string=''):
+    """GET через ASGI-приложение: статус и тело ответа."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {token}'.encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(get_asgi_application()(scope, receive, send))
+    status = messages[0]['status']
+    body = b''.join(
+        message.get('body', b'') for message in messages[1:]
+    )
+    return status, body
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('format, line', (
+    ('txt', 'мука - 300 г'),
+    ('csv', 'мука,г,300'),
+))
+def test_shopping_list_stream_through_asgi(
+    settings, user, make_recipe, format, line
+):
+    # Обработчик ASGI отдаёт потоковый ответ из цикла событий, где запросы
+    # к базе запрещены.
+    settings.ROOT_URLCONF = ASYNC_URLCONF
+    for name, amounts in (('Блины', (200, 50)), ('Оладьи', (100, 10))):
+        recipe = make_recipe(name, amounts=amounts)
+        Cart.objects.create(user=user, recipe=recipe)
+    token, _ = Token.objects.get_or_create(user=user)
+
+    status, body = asgi_get(
+        '/api/recipes/download_shopping_cart/',
+        token.key,
+        f'format={format}',
+    )
+    assert status == 200
+    assert line in body.decode()
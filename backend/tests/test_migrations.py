@@ -0,0 +1,56 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = ('recipes', '0001_initial')
+MERGE = ('recipes', '0002_ingredient_unique_measurement_unit')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_merge_duplicate_ingredients_keeps_amounts():
+    executor = MigrationExecutor(connection)
+    leaf = executor.loader.graph.leaf_nodes()
+    executor.migrate([BEFORE])
+    apps = executor.loader.project_state([BEFORE]).apps
+    try:
+        User = apps.get_model('users', 'User')
+        Ingredient = apps.get_model('recipes', 'Ingredient')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+        author = User.objects.create(
+            email='cook@foodgram.ru', username='cook', password='!'
+        )
+        kept = Ingredient.objects.create(name='мука', measurement_unit='г')
+        duplicate = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        both, only_duplicate = (
+            Recipe.objects.create(
+                author=author, name=name, text='', cooking_time=5,
+                image='recipes/test.png',
+            )
+            for name in ('Блины', 'Оладьи')
+        )
+        IngredientAmount.objects.create(
+            recipe=both, ingredient=kept, amount=200
+        )
+        IngredientAmount.objects.create(
+            recipe=both, ingredient=duplicate, amount=50
+        )
+        IngredientAmount.objects.create(
+            recipe=only_duplicate, ingredient=duplicate, amount=30
+        )
+
+        executor.loader.build_graph()
+        executor.migrate([MERGE])
+
+        amounts = dict(
+            IngredientAmount.objects.filter(
+                ingredient_id=kept.id
+            ).values_list('recipe_id', 'amount')
+        )
+        assert amounts == {both.id: 250, only_duplicate.id: 30}
+        assert not Ingredient.objects.filter(id=duplicate.id).exists()
+    finally:
+        executor.loader.build_graph()
+        executor.migrate(leaf)
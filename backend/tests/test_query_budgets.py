@@ -0,0 +1,35 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.management.commands.benchmark_api import (QUERY_BUDGETS,
+                                                   Command as Benchmark)
+
+# Бюджеты не зависят от объёма данных, поэтому хватает небольшого набора.
+SEED = {'users': 25, 'recipes': 120, 'ingredients': 300}
+PAGE_SIZE = 50
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('name', QUERY_BUDGETS)
+def test_query_budget(name, django_assert_max_num_queries):
+    benchmark = Benchmark()
+    user = benchmark.seed(SEED)
+    scenarios = {
+        scenario: (client_user, url)
+        for scenario, client_user, url in benchmark.get_scenarios(
+            user, PAGE_SIZE
+        )
+    }
+    client_user, url = scenarios[name]
+    client = APIClient()
+    if client_user is not None:
+        token = Token.objects.create(user=client_user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    # Первый запрос может заполнять кеши и индексы, бюджет проверяется
+    # по прогретому.
+    assert client.get(url).status_code == 200
+    with django_assert_max_num_queries(QUERY_BUDGETS[name]):
+        response = client.get(url)
+    assert response.status_code == 200
@@ -0,0 +1,229 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.pagination import CustomUserPagination
+from api.versions import get_version
+from recipes.models import Cart, Favorite
+
+pytestmark = pytest.mark.django_db
+
+
+def test_recipe_detail_not_modified(user_client, make_recipe):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/'
+
+    response = user_client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_fields_and_omit(api_client, make_recipe):
+    make_recipe()
+
+    response = api_client.get('/api/recipes/?fields=id,name')
+    assert response.status_code == 200
+    assert set(response.data['results'][0]) == {'id', 'name'}
+
+    response = api_client.get('/api/recipes/?omit=text,ingredients')
+    fields = set(response.data['results'][0])
+    assert 'text' not in fields
+    assert 'ingredients' not in fields
+    assert {'id', 'name', 'author', 'tags'} <= fields
+
+
+def test_ids_keep_order_and_skip_missing(api_client, make_recipe):
+    first = make_recipe('Блины')
+    second = make_recipe('Оладьи')
+
+    response = api_client.get(f'/api/recipes/?ids={second.id},{first.id},0')
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data] == [
+        second.id, first.id
+    ]
+
+    response = api_client.get('/api/recipes/?ids=1,abc')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('url_name, model, flag, counter', (
+    ('favorite', Favorite, 'is_favorited', 'favorites_count'),
+    ('shopping_cart', Cart, 'is_in_shopping_cart', 'in_carts_count'),
+))
+def test_relation_toggle_is_idempotent(
+    user, user_client, make_recipe, url_name, model, flag, counter
+):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/{url_name}/'
+    detail_url = f'/api/recipes/{recipe.id}/'
+    assert user_client.get(detail_url).data[flag] is False
+
+    assert user_client.post(url).status_code == 201
+    assert user_client.post(url).status_code == 400
+    assert model.objects.filter(user=user, recipe=recipe).count() == 1
+    recipe.refresh_from_db()
+    assert getattr(recipe, counter) == 1
+    assert user_client.get(detail_url).data[flag] is True
+
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 400
+    assert not model.objects.filter(user=user, recipe=recipe).exists()
+    recipe.refresh_from_db()
+    assert getattr(recipe, counter) == 0
+    assert user_client.get(detail_url).data[flag] is False
+
+
+def test_relation_toggle_unknown_recipe(user_client):
+    assert user_client.post('/api/recipes/999/favorite/').status_code == 404
+
+
+def test_bulk_favorite(user, user_client, make_recipe):
+    recipes = [make_recipe('Блины'), make_recipe('Оладьи')]
+    ids = [recipe.id for recipe in recipes]
+
+    response = user_client.post(
+        '/api/recipes/favorite/', {'recipes': ids}, format='json'
+    )
+    assert response.status_code == 201
+    assert [recipe['id'] for recipe in response.data] == ids
+    for recipe in recipes:
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 1
+
+    response = user_client.delete(
+        '/api/recipes/favorite/', {'recipes': ids}, format='json'
+    )
+    assert response.status_code == 204
+    assert not Favorite.objects.filter(user=user).exists()
+    for recipe in recipes:
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 0
+
+
+@pytest.mark.parametrize('query', ('', '?cursor='))
+def test_default_page_size_ignores_cursor(user_client, make_recipe, query):
+    for name in ('Блины', 'Оладьи', 'Сырники'):
+        make_recipe(name)
+    response = user_client.get(f'/api/recipes/{query}')
+    assert response.status_code == 200
+    assert len(response.data['results']) == CustomUserPagination.page_size
+
+
+@pytest.mark.parametrize('method', ('post', 'delete'))
+def test_bulk_favorite_limit(settings, user_client, method):
+    ids = list(range(1, settings.RECIPES_BATCH_MAX + 2))
+    response = getattr(user_client, method)(
+        '/api/recipes/favorite/', {'recipes': ids}, format='json'
+    )
+    assert response.status_code == 400
+    assert 'recipes' in response.data
+    assert str(ids[-1]) not in str(response.data)
+
+
+def test_recipes_count(user, make_recipe):
+    recipe = make_recipe()
+    user.refresh_from_db()
+    assert user.recipes_count == 1
+
+    recipe.delete()
+    user.refresh_from_db()
+    assert user.recipes_count == 0
+
+
+def test_shopping_list_txt(user, user_client, make_recipe):
+    first = make_recipe('Блины', amounts=(200, 50))
+    second = make_recipe('Оладьи', amounts=(100, 10))
+    Cart.objects.create(user=user, recipe=first)
+    Cart.objects.create(user=user, recipe=second)
+
+    response = user_client.get(
+        '/api/recipes/download_shopping_cart/', HTTP_ACCEPT='text/plain'
+    )
+    assert response.status_code == 200
+    content = b''.join(response.streaming_content).decode()
+    assert 'мука - 300 г' in content
+    assert 'сахар - 60 г' in content
+
+
+@pytest.mark.parametrize('query', ('', '?format=txt', '?format=csv'))
+def test_shopping_list_errors_are_json(api_client, query):
+    response = api_client.get(f'/api/recipes/download_shopping_cart/{query}')
+    assert response.status_code == 401
+    assert response['Content-Type'] == 'application/json'
+    assert 'detail' in response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recipe_edit_invalidates_etag(
+    user_client, make_recipe, tags, ingredients
+):
+    # Версии сдвигаются после коммита, поэтому нужна настоящая транзакция.
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/'
+    etag = user_client.get(url)['ETag']
+
+    response = user_client.patch(url, {
+        'name': 'Блины на молоке',
+        'text': 'Новое описание',
+        'cooking_time': 30,
+        'tags': [tag.id for tag in tags],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 250}],
+    }, format='json')
+    assert response.status_code == 200
+
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.data['name'] == 'Блины на молоке'
+    assert [item['amount'] for item in response.data['ingredients']] == [250]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_recipe_version_changes_after_commit(make_recipe):
+    recipe = make_recipe()
+    version = get_version(f'recipe:{recipe.id}')
+
+    with transaction.atomic():
+        recipe.name = 'Блины на молоке'
+        recipe.save()
+        # Параллельный запрос до коммита должен видеть старую версию.
+        assert get_version(f'recipe:{recipe.id}') == version
+
+    assert get_version(f'recipe:{recipe.id}') != version
+
+
+@pytest.mark.django_db(transaction=True)
+def test_shopping_list_pdf_follows_ingredient_edit(
+    user, user_client, make_recipe, ingredients
+):
+    recipe = make_recipe()
+    Cart.objects.create(user=user, recipe=recipe)
+    url = '/api/recipes/download_shopping_cart/'
+    pdf = user_client.get(url).content
+    assert user_client.get(url).content == pdf
+    version = get_version(f'cart:{user.id}')
+
+    with transaction.atomic():
+        amount = recipe.ingredientamount_set.get(ingredient=ingredients[0])
+        amount.amount = 999
+        amount.save()
+        # До коммита версия прежняя, иначе в кеш под новой версией попадёт
+        # старый список.
+        assert get_version(f'cart:{user.id}') == version
+        assert user_client.get(url).content == pdf
+
+    assert user_client.get(url).content != pdf
+
+
+def test_single_toggle_does_not_recount(user_client, make_recipe):
+    recipe = make_recipe()
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    for method in (user_client.post, user_client.delete):
+        with CaptureQueriesContext(connection) as context:
+            method(url)
+        assert not any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        )
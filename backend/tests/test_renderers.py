@@ -0,0 +1,51 @@
+import pytest
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+
+@pytest.mark.parametrize('value', (
+    0.0, 0.5, -3.25, 1e-4, 1e15, 1e16, -2.5e22, 1.5e-7, 123456789.125,
+))
+def test_floats_match_json_renderer(value):
+    data = {'results': [{'coverage': value}]}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize('value', (
+    float('nan'), float('inf'), float('-inf'),
+))
+def test_non_finite_floats_are_rejected(value):
+    with pytest.raises(ValueError):
+        JSONRenderer().render({'value': value})
+    with pytest.raises(ValueError):
+        FastJSONRenderer().render({'value': value})
+
+
+class CoverageSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    coverage = serializers.FloatField()
+
+
+class NameSerializer(serializers.Serializer):
+    name = serializers.CharField()
+
+
+def test_serializer_floats_match_json_renderer():
+    results = CoverageSerializer(
+        [{'name': 'Блины', 'coverage': 1 / 20000}], many=True
+    ).data
+    data = {'count': 1, 'results': results}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_serializer_without_floats_is_not_walked(monkeypatch):
+    def fail(data):
+        raise AssertionError('Ответ без FloatField обходится целиком')
+
+    monkeypatch.setattr('api.renderers.has_special_floats', fail)
+    data = {'count': 1, 'results': NameSerializer(
+        [{'name': 'Блины'}], many=True
+    ).data}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
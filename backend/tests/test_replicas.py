@@ -0,0 +1,61 @@
+import pytest
+from django.db.utils import ConnectionDoesNotExist
+from django.test import override_settings
+
+from api.relations import load_relations
+from foodgram import db_router
+from recipes.models import Cart, Favorite
+
+# Реплики нет среди подключений: любое чтение с неё падает. Внутри
+# транзакции теста роутер всегда выбирает основную базу, поэтому нужны
+# настоящие транзакции.
+pytestmark = [
+    pytest.mark.django_db(transaction=True),
+    pytest.mark.usefixtures('missing_replica'),
+]
+
+
+@pytest.fixture
+def missing_replica():
+    with override_settings(DATABASE_REPLICAS=['replica']):
+        yield
+
+
+def test_list_reads_replica(user_client, make_recipe):
+    make_recipe()
+    with pytest.raises(ConnectionDoesNotExist):
+        user_client.get('/api/recipes/')
+
+
+def test_versioned_endpoints_read_primary(
+    user, api_client, user_client, make_recipe, tags, ingredients
+):
+    recipe = make_recipe()
+    Cart.objects.create(user=user, recipe=recipe)
+    for client, url in (
+        (user_client, f'/api/recipes/{recipe.id}/'),
+        (user_client, '/api/recipes/download_shopping_cart/'),
+        (api_client, '/api/tags/'),
+        (api_client, f'/api/tags/{tags[0].id}/'),
+        (api_client, '/api/ingredients/'),
+        (api_client, f'/api/ingredients/{ingredients[0].id}/'),
+    ):
+        assert client.get(url).status_code == 200, url
+
+
+def test_relations_cache_reads_primary(user, another_user, make_recipe):
+    recipe = make_recipe()
+    Favorite.objects.create(user=user, recipe=recipe)
+    Cart.objects.create(user=user, recipe=recipe)
+    user.follower.create(author=another_user)
+    # Как для безопасного запроса без закрепления за основной базой.
+    token = db_router._use_primary.set(False)
+    try:
+        relations = load_relations(user.id)
+    finally:
+        db_router._use_primary.reset(token)
+    assert relations == {
+        'favorites': {recipe.id},
+        'cart': {recipe.id},
+        'follows': {another_user.id},
+    }
@@ -0,0 +1,37 @@
+import pytest
+
+# Кеш подписок обновляется после коммита, поэтому нужны настоящие транзакции.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def test_subscribe_and_unsubscribe(
+    user, another_user, another_client, make_recipe
+):
+    make_recipe()
+    url = f'/api/users/{user.id}/subscribe/'
+    profile_url = f'/api/users/{user.id}/'
+    assert another_client.get(profile_url).data['is_subscribed'] is False
+
+    response = another_client.post(url)
+    assert response.status_code == 201
+    assert response.data['recipes_count'] == 1
+    assert another_client.post(url).status_code == 400
+    user.refresh_from_db()
+    assert user.followers_count == 1
+    assert another_client.get(profile_url).data['is_subscribed'] is True
+
+    response = another_client.get('/api/users/subscriptions/')
+    assert [author['id'] for author in response.data['results']] == [
+        user.id
+    ]
+
+    assert another_client.delete(url).status_code == 204
+    assert another_client.delete(url).status_code == 400
+    user.refresh_from_db()
+    assert user.followers_count == 0
+    assert another_client.get(profile_url).data['is_subscribed'] is False
+
+
+def test_cannot_subscribe_to_self(user, user_client):
+    response = user_client.post(f'/api/users/{user.id}/subscribe/')
+    assert response.status_code == 400
@@ -5,9 +5,13 @@ from .models import Follow, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'email', 'username', 'first_name', 'last_name')
+    list_display = (
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'recipes_count', 'followers_count',
+    )
     search_fields = ('username', 'email')
     empty_value_display = '-empty-'
+    readonly_fields = ('recipes_count', 'followers_count')
 
 
 @admin.register(Follow)
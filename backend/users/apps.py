@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     name = 'users'
     default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -33,6 +33,16 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ('first_name', 'last_name', 'username')
     is_active = models.BooleanField(default=True)
     is_admin = models.BooleanField(default=False)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
     objects = AppUserManager()
 
     class Meta: